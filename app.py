@@ -1,12 +1,10 @@
-import json
 import os
 import sys
+import traceback
 from pathlib import Path
 from typing import Optional
-import queue
-from datetime import datetime
 
-from PySide6.QtCore import Qt, QTimer
+from PySide6.QtCore import Qt, QTimer, QObject, Signal
 from PySide6.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -31,10 +29,16 @@ from sync.config import AppConfig, load_config, save_config, default_config_path
 from sync.device_id import ensure_device_id
 from sync.scheduler import SyncEngine
 from sync.crypto_util import encrypt_to_base64, decrypt_from_base64
-from dataclasses import asdict
+from sync._json import dumps, loads
 import time
 
 
+class EngineBridge(QObject):
+    """同步线程回调经 Qt 信号投递到 GUI 线程（跨线程自动走队列连接）。"""
+    log_sig = Signal(str)
+    state_sig = Signal(str)
+
+
 class SettingsDialog(QDialog):
     def __init__(self, cfg: AppConfig, parent=None):
         super().__init__(parent)
@@ -55,6 +59,10 @@ class SettingsDialog(QDialog):
         self.interval_spin.setRange(1, 120)
         self.interval_spin.setValue(self.cfg.scan_interval_minutes or 5)
 
+        self.concurrency_spin = QSpinBox()
+        self.concurrency_spin.setRange(1, 32)
+        self.concurrency_spin.setValue(getattr(self.cfg, "upload_concurrency", 0) or 8)
+
         self.force_cb = QCheckBox("强制上传(忽略锁)")
         self.force_cb.setChecked(bool(getattr(self.cfg, "force_upload_ignore_lock", False)))
 
@@ -64,6 +72,7 @@ class SettingsDialog(QDialog):
         form.addRow("域名(含协议):", self.domain_edit)
         form.addRow("Region(可选):", self.region_edit)
         form.addRow("扫描间隔(分钟):", self.interval_spin)
+        form.addRow("上传并发数:", self.concurrency_spin)
         form.addRow("上传选项:", self.force_cb)
         layout.addLayout(form)
 
@@ -79,6 +88,7 @@ class SettingsDialog(QDialog):
         self.cfg.qiniu_domain = self.domain_edit.text().strip()
         self.cfg.qiniu_region = self.region_edit.text().strip()
         self.cfg.scan_interval_minutes = int(self.interval_spin.value())
+        self.cfg.upload_concurrency = int(self.concurrency_spin.value())
         self.cfg.force_upload_ignore_lock = bool(self.force_cb.isChecked())
         save_config(default_config_path(), self.cfg)
         self.accept()
@@ -95,11 +105,12 @@ class MainWindow(QMainWindow):
         ensure_device_id(self.config)
         save_config(self.config_path, self.config)
 
-        self._log_queue: "queue.SimpleQueue[str]" = queue.SimpleQueue()
-        self._state_queue: "queue.SimpleQueue[str]" = queue.SimpleQueue()
-        self.engine = SyncEngine(self.enqueue_log, self.enqueue_state)
+        self.bridge = EngineBridge(self)
+        self._pending_logs: list[str] = []
+        self.engine = SyncEngine(self.bridge.log_sig.emit, self.bridge.state_sig.emit)
         self._log_file_path = self._resolve_log_path()
         self._ensure_log_dir()
+        self._log_fh = self._open_log_file()
 
         # Menu
         settings_action = QAction("首选项...", self)
@@ -162,15 +173,17 @@ class MainWindow(QMainWindow):
         self.log_view.setReadOnly(True)
         layout.addWidget(self.log_view, 1)
 
-        # Timer for periodic UI heartbeat (optional)
-        self.ui_timer = QTimer(self)
-        self.ui_timer.setInterval(200)
-        self.ui_timer.timeout.connect(self.refresh_ui)
-        self.ui_timer.start()
+        # Countdown timer (1s resolution; 半秒唤醒一次避免计时抖动跳秒)
+        # 仅在收到 NEXT| 倒计时后启动，归零即停，空闲时不唤醒
+        self.countdown_timer = QTimer(self)
+        self.countdown_timer.setInterval(500)
+        self.countdown_timer.timeout.connect(self.tick_countdown)
 
         # Wire events
         self.start_btn.clicked.connect(self.on_start_clicked)
         self.stop_btn.clicked.connect(self.stop_sync)
+        self.bridge.log_sig.connect(self.on_log_emitted)
+        self.bridge.state_sig.connect(self.on_sync_state_change)
 
         self.append_log("应用已启动")
 
@@ -202,17 +215,40 @@ class MainWindow(QMainWindow):
         except Exception:
             pass
 
-    def enqueue_log(self, text: str):
+    def _open_log_file(self):
         try:
-            self._log_queue.put(text)
+            return open(self._log_file_path, "a", encoding="utf-8", buffering=65536)
+        except Exception:
+            return None
+
+    def _flush_log_file(self):
+        try:
+            if self._log_fh:
+                self._log_fh.flush()
         except Exception:
             pass
 
-    def enqueue_state(self, state: str):
+    def closeEvent(self, event):
+        self._flush_log_file()
         try:
-            self._state_queue.put(state)
+            if self._log_fh:
+                self._log_fh.close()
+                self._log_fh = None
         except Exception:
             pass
+        super().closeEvent(event)
+
+    def on_log_emitted(self, text: str):
+        # 同一轮事件循环内到达的日志合并后一次性追加
+        if not self._pending_logs:
+            QTimer.singleShot(0, self._flush_pending_logs)
+        self._pending_logs.append(text)
+
+    def _flush_pending_logs(self):
+        buf, self._pending_logs = self._pending_logs, []
+        if buf:
+            self._append_log_lines(buf)
+            self._flush_log_file()
 
     def open_settings(self):
         dlg = SettingsDialog(self.config, self)
@@ -222,9 +258,8 @@ class MainWindow(QMainWindow):
 
     def export_config_string(self):
         try:
-            data = asdict(self.config)
-            payload = json.dumps(data, ensure_ascii=False)
-            token = encrypt_to_base64(payload.encode("utf-8"))
+            data = self.config.to_dict()
+            token = encrypt_to_base64(dumps(data))
 
             dlg = QDialog(self)
             dlg.setWindowTitle("导出配置字符串")
@@ -260,7 +295,7 @@ class MainWindow(QMainWindow):
                     QMessageBox.warning(self, "提示", "请输入导入字符串")
                     return
                 plaintext = decrypt_from_base64(token)
-                data = json.loads(plaintext.decode("utf-8"))
+                data = loads(plaintext)
                 # 合并为 AppConfig 并保存
                 self.config = AppConfig(**data)
                 ensure_device_id(self.config)
@@ -340,12 +375,18 @@ class MainWindow(QMainWindow):
             self.start_btn.setText("立刻刷新")
 
     def append_log(self, text: str):
-        ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        line = f"[{ts}] {text}"
-        self.log_view.appendPlainText(line)
+        # 先落下尚未刷新的同步线程日志，保持时间顺序
+        self._flush_pending_logs()
+        self._append_log_lines([text])
+
+    def _append_log_lines(self, lines: list[str]):
+        # 一批日志共用一个时间戳，合并为一次控件追加与一次文件写入
+        ts = time.strftime("%Y-%m-%d %H:%M:%S")
+        block = "\n".join(f"[{ts}] {text}" for text in lines)
+        self.log_view.appendPlainText(block)
         try:
-            with open(self._log_file_path, "a", encoding="utf-8") as f:
-                f.write(line + "\n")
+            if self._log_fh:
+                self._log_fh.write(block + "\n")
         except Exception:
             pass
 
@@ -382,6 +423,10 @@ class MainWindow(QMainWindow):
                     self._next_seconds_remaining = 0
                 self._last_countdown_tick = time.time()
                 self.sb_countdown.setText(f"下次: {self._next_seconds_remaining}s")
+                if self._next_seconds_remaining > 0:
+                    self.countdown_timer.start()
+                else:
+                    self.countdown_timer.stop()
                 return
             if state == "NO_DIFF":
                 # 进入等待期且无差异：切换为“立刻刷新”并可点击
@@ -410,17 +455,7 @@ class MainWindow(QMainWindow):
             self.start_btn.setEnabled(True)
         self.append_log(f"状态变更: {state}")
 
-    def refresh_ui(self):
-        # Drain state queue
-        drained_state = None
-        try:
-            while True:
-                drained_state = self._state_queue.get_nowait()
-        except Exception:
-            pass
-        if drained_state is not None:
-            self.on_sync_state_change(drained_state)
-        # Countdown tick (1s resolution)
+    def tick_countdown(self):
         try:
             now = time.time()
             if self._next_seconds_remaining > 0 and now - self._last_countdown_tick >= 1.0:
@@ -428,37 +463,41 @@ class MainWindow(QMainWindow):
                 self._next_seconds_remaining = max(0, self._next_seconds_remaining - dec)
                 self._last_countdown_tick = now
                 self.sb_countdown.setText(f"下次: {self._next_seconds_remaining}s")
-        except Exception:
-            pass
-        # Drain logs
-        try:
-            while True:
-                msg = self._log_queue.get_nowait()
-                self.append_log(msg)
+            if self._next_seconds_remaining <= 0:
+                self.countdown_timer.stop()
         except Exception:
             pass
 
 
+# MainWindow 已打开的日志句柄，崩溃时直接复用
+_LOG_FH = None
+
+
 def _global_excepthook(exctype, value, tb):
     try:
-        base = app_data_dir()
-        log_path = str(base / "app.log")
-        Path(log_path).parent.mkdir(parents=True, exist_ok=True)
-        import traceback
-        with open(log_path, "a", encoding="utf-8") as f:
-            f.write("\n=== 未捕获异常 ===\n")
-            traceback.print_exception(exctype, value, tb, file=f)
+        fh = _LOG_FH
+        if fh is not None and not fh.closed:
+            fh.write("\n=== 未捕获异常 ===\n")
+            traceback.print_exception(exctype, value, tb, file=fh)
+            fh.flush()
+        else:
+            log_path = app_data_dir() / "app.log"
+            log_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(log_path, "a", encoding="utf-8") as f:
+                f.write("\n=== 未捕获异常 ===\n")
+                traceback.print_exception(exctype, value, tb, file=f)
     except Exception:
         pass
     # Also print to stderr
-    import traceback
     traceback.print_exception(exctype, value, tb)
 
 
 def main():
+    global _LOG_FH
     sys.excepthook = _global_excepthook
     app = QApplication(sys.argv)
     w = MainWindow()
+    _LOG_FH = w._log_fh
     w.show()
     sys.exit(app.exec())
 
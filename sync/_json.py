@@ -0,0 +1,34 @@
+"""JSON 编解码：优先使用 orjson（直接产出 bytes），未安装时回退到标准库 json。"""
+import os
+from pathlib import Path
+from typing import Any, Union
+
+try:
+    import orjson
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    def loads(data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+except ImportError:
+    import json
+
+    def dumps(obj: Any) -> bytes:
+        # 紧凑分隔符 + ASCII 转义，保持在 C 编码器的快速路径上
+        return json.dumps(obj, ensure_ascii=True, separators=(",", ":")).encode("ascii")
+
+    def loads(data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+
+def dump_file(path: Union[str, Path], obj: Any) -> None:
+    """序列化后一次写入临时文件再 os.replace，崩溃时不会留下半截文件。"""
+    path = Path(path)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb", buffering=1 << 20) as f:
+        f.write(dumps(obj))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
@@ -1,7 +1,7 @@
-import json
 from pathlib import Path
 from typing import Optional, Tuple, Dict, Any
 
+from ._json import dump_file, loads
 from .config import app_data_dir
 
 
@@ -15,7 +15,7 @@ def load_manifest_cache(profile_key: str) -> Tuple[Optional[Dict[str, Any]], Opt
     try:
         path = _cache_file(profile_key)
         if path.exists():
-            data = json.loads(path.read_text(encoding="utf-8"))
+            data = loads(path.read_bytes())
             return data.get("manifest"), data.get("etag")
     except Exception:
         pass
@@ -27,6 +27,6 @@ def save_manifest_cache(profile_key: str, manifest: Dict[str, Any], etag: Option
         path = _cache_file(profile_key)
         path.parent.mkdir(parents=True, exist_ok=True)
         payload = {"manifest": manifest, "etag": etag}
-        path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        dump_file(path, payload)
     except Exception:
         pass 
\ No newline at end of file
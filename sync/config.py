@@ -1,9 +1,11 @@
-import json
+import functools
 import os
 import platform
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Optional
+
+from ._json import dump_file, loads
 
 
 APP_DIR_NAME = "NTXT_SYNC"
@@ -23,15 +25,18 @@ class AppConfig:
 
     scan_interval_minutes: int = 5
     force_upload_ignore_lock: bool = False
+    upload_concurrency: int = 8
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
 
-def app_data_dir() -> Path:
+
+def _compute_app_data_dir() -> Path:
     try:
-        system = platform.system()
-        if system == "Windows":
+        if _SYSTEM == "Windows":
             base = os.getenv("LOCALAPPDATA") or os.getenv("APPDATA") or str(Path.home() / "AppData" / "Local")
             return Path(base) / APP_DIR_NAME
-        elif system == "Darwin":
+        elif _SYSTEM == "Darwin":
             return Path.home() / "Library" / "Application Support" / APP_DIR_NAME
         else:
             return Path(os.getenv("XDG_DATA_HOME", str(Path.home() / ".local" / "share"))) / APP_DIR_NAME
@@ -39,6 +44,15 @@ def app_data_dir() -> Path:
         return Path.cwd() / APP_DIR_NAME
 
 
+_SYSTEM = platform.system()
+_APP_DATA_DIR = _compute_app_data_dir()
+
+
+def app_data_dir() -> Path:
+    return _APP_DATA_DIR
+
+
+@functools.lru_cache(maxsize=1)
 def default_config_path() -> str:
     p = app_data_dir()
     p.mkdir(parents=True, exist_ok=True)
@@ -48,9 +62,7 @@ def default_config_path() -> str:
 def load_config(path: str) -> AppConfig:
     try:
         if os.path.exists(path):
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            return AppConfig(**data)
+            return AppConfig(**loads(Path(path).read_bytes()))
     except Exception:
         pass
     return AppConfig()
@@ -59,8 +71,7 @@ def load_config(path: str) -> AppConfig:
 def save_config(path: str, cfg: AppConfig) -> None:
     try:
         Path(path).parent.mkdir(parents=True, exist_ok=True)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(asdict(cfg), f, ensure_ascii=False, indent=2)
+        dump_file(path, cfg.to_dict())
     except Exception as e:
         # Best-effort save; surface errors to caller if needed
         raise 
\ No newline at end of file
@@ -1,31 +1,53 @@
-import base64
 import hashlib
 import hmac
 import os
 from typing import Tuple
 
+try:
+    import pybase64 as _b64
+except ImportError:
+    import base64 as _b64
+
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:  # 未安装 cryptography 时回退到 CFG1 格式
+    Cipher = None
+
 
 # 固定密码（按需求约定）
 PASSWORD = "Myazure"
+_DEFAULT_KEY = hashlib.sha256(PASSWORD.encode("utf-8")).digest()
+
+# 版本头：CFG1 为 HMAC-SHA256 计数器密钥流（旧格式），CFG2 为 AES-256-CTR
+HEADER_V1 = b"CFG1"
+HEADER_V2 = b"CFG2"
 
 
 def _derive_key(password: str) -> bytes:
+    if password == PASSWORD:
+        return _DEFAULT_KEY
     return hashlib.sha256(password.encode("utf-8")).digest()
 
 
 def _keystream(key: bytes, iv: bytes, length: int) -> bytes:
-    out = bytearray()
-    counter = 0
-    while len(out) < length:
-        ctr = counter.to_bytes(8, "big")
-        block = hmac.new(key, iv + ctr, hashlib.sha256).digest()
-        out.extend(block)
-        counter += 1
-    return bytes(out[:length])
+    blocks = (length + 31) // 32
+    out = b"".join(hmac.digest(key, iv + i.to_bytes(8, "big"), "sha256") for i in range(blocks))
+    return out[:length]
+
+
+def _xor(data: bytes, ks: bytes) -> bytes:
+    # 大整数异或在 C 层按 digit 处理，避免逐字节 Python 循环
+    n = len(data)
+    return (int.from_bytes(data, "big") ^ int.from_bytes(ks, "big")).to_bytes(n, "big")
+
+
+def _aes_ctr(key: bytes, iv: bytes, data: bytes) -> bytes:
+    # CTR 模式加解密对称，一次 C 调用完成（OpenSSL 走 AES-NI）
+    return Cipher(algorithms.AES(key), modes.CTR(iv)).encryptor().update(data)
 
 
 def _seal(payload: bytes, key: bytes) -> bytes:
-    tag = hmac.new(key, payload, hashlib.sha256).digest()
+    tag = hmac.digest(key, payload, "sha256")
     return payload + tag
 
 
@@ -33,7 +55,7 @@ def _open(sealed: bytes, key: bytes) -> Tuple[bool, bytes]:
     if len(sealed) < 32:
         return False, b""
     payload, tag = sealed[:-32], sealed[-32:]
-    expect = hmac.new(key, payload, hashlib.sha256).digest()
+    expect = hmac.digest(key, payload, "sha256")
     if not hmac.compare_digest(tag, expect):
         return False, b""
     return True, payload
@@ -42,25 +64,29 @@ def _open(sealed: bytes, key: bytes) -> Tuple[bool, bytes]:
 def encrypt_to_base64(plaintext: bytes, password: str = PASSWORD) -> str:
     key = _derive_key(password)
     iv = os.urandom(16)
-    ks = _keystream(key, iv, len(plaintext))
-    ct = bytes([a ^ b for a, b in zip(plaintext, ks)])
-    header = b"CFG1"  # 版本头
+    if Cipher is not None:
+        header = HEADER_V2
+        ct = _aes_ctr(key, iv, plaintext)
+    else:
+        header = HEADER_V1
+        ct = _xor(plaintext, _keystream(key, iv, len(plaintext)))
     sealed = _seal(header + iv + ct, key)
-    return base64.urlsafe_b64encode(sealed).decode("ascii")
+    return _b64.urlsafe_b64encode(sealed).decode("ascii")
 
 
 def decrypt_from_base64(token: str, password: str = PASSWORD) -> bytes:
     key = _derive_key(password)
-    raw = base64.urlsafe_b64decode(token.encode("ascii"))
+    raw = _b64.urlsafe_b64decode(token.encode("ascii"))
     ok, payload = _open(raw, key)
     if not ok:
         raise ValueError("密文校验失败，可能口令不正确或数据损坏")
-    if not payload.startswith(b"CFG1"):
-        raise ValueError("密文版本不支持")
+    header = payload[:4]
     iv = payload[4:20]
     ct = payload[20:]
-    ks = _keystream(key, iv, len(ct))
-    pt = bytes([a ^ b for a, b in zip(ct, ks)])
-    return pt
-
-
+    if header == HEADER_V2:
+        if Cipher is None:
+            raise ValueError("该密文需要安装 cryptography 才能解密")
+        return _aes_ctr(key, iv, ct)
+    if header == HEADER_V1:
+        return _xor(ct, _keystream(key, iv, len(ct)))
+    raise ValueError("密文版本不支持")
@@ -2,58 +2,72 @@ import hashlib
 import json
 import os
 import platform
-import subprocess
 import uuid
 from typing import Optional
 
-from .config import AppConfig
+from .config import AppConfig, app_data_dir
+
+
+DEVICE_ID_FILE = "device_id"
 
 
 def _get_machine_fingerprint() -> str:
+    # 纯进程内信息，避免在启动时拉起 wmic 子进程
     parts = []
     try:
         parts.append(platform.node())
     except Exception:
         pass
     try:
-        if platform.system() == "Windows":
-            try:
-                # Disk serial
-                out = subprocess.check_output(
-                    ["wmic", "diskdrive", "get", "SerialNumber"],
-                    stderr=subprocess.DEVNULL,
-                    text=True,
-                    timeout=3,
-                )
-                parts.append(out.strip())
-            except Exception:
-                pass
-            try:
-                out = subprocess.check_output(
-                    ["wmic", "baseboard", "get", "Product"],
-                    stderr=subprocess.DEVNULL,
-                    text=True,
-                    timeout=3,
-                )
-                parts.append(out.strip())
-            except Exception:
-                pass
-        else:
-            # Non-Windows: fall back to uname
-            parts.append(" ".join(platform.uname()))
+        node = uuid.getnode()
+        # 取不到网卡地址时 getnode 返回随机值（组播位为 1），不能用于稳定标识
+        if not (node >> 40) & 1:
+            parts.append(f"{node:012x}")
+    except Exception:
+        pass
+    try:
+        parts.append(platform.machine())
     except Exception:
         pass
     return "|".join(p for p in parts if p)
 
 
+def _read_sidecar() -> Optional[str]:
+    try:
+        cached = (app_data_dir() / DEVICE_ID_FILE).read_text(encoding="utf-8").strip()
+        return cached or None
+    except Exception:
+        return None
+
+
+def _write_sidecar(device_id: str) -> None:
+    try:
+        path = app_data_dir() / DEVICE_ID_FILE
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(device_id, encoding="utf-8")
+    except Exception:
+        pass
+
+
 def generate_device_id() -> str:
+    # 优先复用落盘的设备标识，导入/重置配置时不必重新探测
+    cached = _read_sidecar()
+    if cached:
+        return cached
     fp = _get_machine_fingerprint()
     if not fp:
-        return str(uuid.uuid4())
-    digest = hashlib.sha256(fp.encode("utf-8")).hexdigest()
-    return f"dev-{digest[:16]}"
+        device_id = str(uuid.uuid4())
+    else:
+        digest = hashlib.blake2b(fp.encode("utf-8"), digest_size=8).hexdigest()
+        device_id = f"dev-{digest}"
+    _write_sidecar(device_id)
+    return device_id
 
 
 def ensure_device_id(cfg: AppConfig) -> None:
-    if not cfg.device_id:
-        cfg.device_id = generate_device_id() 
\ No newline at end of file
+    if cfg.device_id:
+        # 旧版本只把标识存在配置里：补写落盘文件，之后重置/导入配置仍沿用同一标识
+        if not _read_sidecar():
+            _write_sidecar(cfg.device_id)
+        return
+    cfg.device_id = generate_device_id()
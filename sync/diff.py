@@ -1,4 +1,7 @@
-from typing import Dict, List, Tuple
+from operator import itemgetter
+from typing import Dict, List, Mapping
+
+from .manifest import ManifestEntry
 
 
 class DiffResult:
@@ -9,21 +12,19 @@ class DiffResult:
         self.conflicts: List[str] = []
 
 
-def compute_diff(local: Dict[str, Dict], server: Dict[str, Dict]) -> DiffResult:
+def compute_diff(local: Dict[str, Dict], server: Mapping[str, ManifestEntry]) -> DiffResult:
     r = DiffResult()
-    local_keys = set(local.keys())
-    server_keys = set(server.keys())
+    local_keys = local.keys()
+    server_keys = server.keys()
+    md5 = itemgetter("md5")
 
-    # New or modified locally (by md5)
-    for k in sorted(local_keys - server_keys):
-        r.to_upload.append(k)
-    for k in sorted(local_keys & server_keys):
-        if (local[k] or {}).get("md5") != (server[k] or {}).get("md5"):
-            r.to_upload.append(k)
+    # New or modified locally (by md5): 键集合运算在 C 层完成，只对交集逐个比较
+    r.to_upload = list(local_keys - server_keys)
+    r.to_upload.extend(k for k in local_keys & server_keys if md5(local[k]) != server[k].md5)
 
     # Present on server but missing locally -> delete on remote
-    for k in sorted(server_keys - local_keys):
-        if not (server[k] or {}).get("deleted"):
-            r.to_delete_remote.append(k)
+    r.to_delete_remote = [k for k in server_keys - local_keys if not server[k].deleted]
 
-    return r 
\ No newline at end of file
+    r.to_upload.sort()
+    r.to_delete_remote.sort()
+    return r
@@ -1,4 +1,4 @@
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field, fields
 from typing import Dict, Any
 from datetime import datetime, timezone
 
@@ -6,7 +6,7 @@ from datetime import datetime, timezone
 MANIFEST_KEY = "__sync/manifest.json"
 
 
-@dataclass
+@dataclass(slots=True)
 class ManifestEntry:
     rel_path: str
     size: int
@@ -18,6 +18,9 @@ class ManifestEntry:
     deleted: int = 0
 
 
+_ENTRY_FIELDS = tuple(f.name for f in fields(ManifestEntry))
+
+
 @dataclass
 class Manifest:
     version: int
@@ -32,9 +35,14 @@ class Manifest:
         return Manifest(version=1, manifest_seq=0, generated_at_utc=now, generator_device_id=device_id, files={})
 
     def to_dict(self) -> Dict[str, Any]:
-        d = asdict(self)
-        d["files"] = {k: asdict(v) for k, v in self.files.items()}
-        return d
+        # 字段均为标量，直接取值即可，避免 asdict 逐字段 deepcopy
+        return {
+            "version": self.version,
+            "manifest_seq": self.manifest_seq,
+            "generated_at_utc": self.generated_at_utc,
+            "generator_device_id": self.generator_device_id,
+            "files": {k: {f: getattr(v, f) for f in _ENTRY_FIELDS} for k, v in self.files.items()},
+        }
 
     @staticmethod
     def from_dict(d: Dict[str, Any]) -> "Manifest":
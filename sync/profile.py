@@ -1,3 +1,4 @@
+import functools
 import hashlib
 import json
 from pathlib import Path
@@ -10,8 +11,15 @@ STATE_FILE = app_data_dir() / "profile_state.json"
 
 
 def compute_profile_key(bucket: Optional[str], domain: Optional[str], local_dir: Optional[str], subdir: Optional[str]) -> str:
+    return _compute_profile_key_cached(bucket, domain, local_dir, subdir)
+
+
+@functools.lru_cache(maxsize=32)
+def _compute_profile_key_cached(bucket: Optional[str], domain: Optional[str], local_dir: Optional[str], subdir: Optional[str]) -> str:
+    # Path.resolve() 会访问文件系统，相同参数只计算一次
     sub = (subdir or '').strip().strip('/\\')
     raw = f"bucket={bucket or ''}|domain={domain or ''}|local={Path(local_dir or '').resolve()}|subdir={sub}"
+    # 键值会持久化（profile_state.json、manifest_cache_<key>.json），算法不可随意更换
     return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
 
 
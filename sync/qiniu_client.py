@@ -1,10 +1,12 @@
-import json
-import os
 from dataclasses import asdict
 from typing import Dict, Optional, Tuple
 
-from qiniu import Auth, put_file, BucketManager
+import requests
+from qiniu import Auth, put_data, put_file, BucketManager
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from ._json import dumps, loads
 from .manifest import MANIFEST_KEY, Manifest
 from .lock import LOCK_KEY
 
@@ -18,18 +20,26 @@ class QiniuClient:
         self.region = region
         self.auth = Auth(self.ak, self.sk)
         self.bm = BucketManager(self.auth)
+        # 复用连接池，避免每轮下载清单/锁都重新 TCP+TLS 握手
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=Retry(total=2, backoff_factor=0.2))
+        self._http = requests.Session()
+        self._http.mount("https://", adapter)
+        self._http.mount("http://", adapter)
 
     # Manifest
-    def download_manifest(self) -> Tuple[Optional[Manifest], Optional[str]]:
+    def download_manifest(self, cached: Optional[Dict] = None, cached_etag: Optional[str] = None) -> Tuple[Optional[Manifest], Optional[str]]:
+        """下载远端清单；传入缓存及其 ETag 时走条件请求，304 直接返回缓存。"""
         try:
             # Use private download url if domain provided; fallback to bucket fetch (not direct supported here)
             base_url = f"{self.domain}/{MANIFEST_KEY}" if self.domain else None
             if base_url:
                 private_url = self.auth.private_download_url(base_url, expires=60)
-                import requests
-                r = requests.get(private_url, timeout=10)
+                headers = {"If-None-Match": cached_etag} if cached and cached_etag else {}
+                r = self._http.get(private_url, headers=headers, timeout=10)
+                if r.status_code == 304 and cached:
+                    return Manifest.from_dict(cached), cached_etag
                 if r.status_code == 200:
-                    data = r.json()
+                    data = loads(r.content)
                     # Get ETag header if present
                     etag = r.headers.get("ETag")
                     return Manifest.from_dict(data), etag
@@ -44,15 +54,13 @@ class QiniuClient:
         except Exception:
             return None, None
 
-    def upload_manifest(self, manifest: Manifest) -> bool:
+    def upload_manifest(self, manifest: Manifest, body: Optional[bytes] = None) -> bool:
+        """上传清单；body 为调用方已序列化好的内容时直接使用。"""
         try:
             token = self.auth.upload_token(self.bucket, MANIFEST_KEY, 3600)
-            tmp = json.dumps(manifest.to_dict(), ensure_ascii=False).encode("utf-8")
-            tmp_path = "manifest.tmp.json"
-            with open(tmp_path, "wb") as f:
-                f.write(tmp)
-            ret, info = put_file(token, MANIFEST_KEY, tmp_path)
-            os.remove(tmp_path)
+            if body is None:
+                body = dumps(manifest.to_dict())
+            ret, info = put_data(token, MANIFEST_KEY, body)
             return info.status_code == 200
         except Exception:
             return False
@@ -62,11 +70,10 @@ class QiniuClient:
         try:
             base_url = f"{self.domain}/{LOCK_KEY}" if self.domain else None
             if base_url:
-                import requests
                 private_url = self.auth.private_download_url(base_url, expires=60)
-                r = requests.get(private_url, timeout=10)
+                r = self._http.get(private_url, timeout=10)
                 if r.status_code == 200:
-                    return r.json()
+                    return loads(r.content)
                 return None
             ret, info = self.bm.stat(self.bucket, LOCK_KEY)
             if info.status_code == 612:
@@ -78,11 +85,8 @@ class QiniuClient:
     def upload_lock(self, data: Dict) -> bool:
         try:
             token = self.auth.upload_token(self.bucket, LOCK_KEY, 3600)
-            tmp_path = "lock.tmp.json"
-            with open(tmp_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False)
-            ret, info = put_file(token, LOCK_KEY, tmp_path)
-            os.remove(tmp_path)
+            body = dumps(data)
+            ret, info = put_data(token, LOCK_KEY, body)
             return info.status_code == 200
         except Exception:
             return False
@@ -1,66 +1,179 @@
 import hashlib
 import os
-from datetime import datetime, timezone
-from pathlib import Path
-from typing import Dict, Iterable, List
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+try:
+    import blake3 as _blake3
+except ImportError:
+    _blake3 = None
 
-def _utc_iso(ts: float) -> str:
-    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
 
+def _utc_iso(mtime_ns: int) -> str:
+    # 只在需要写出字符串时格式化；缓存比对统一使用整数 mtime_ns
+    return time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(mtime_ns // 1_000_000_000))
 
-def file_md5(path: str, chunk_size: int = 1024 * 1024) -> str:
-    m = hashlib.md5()
-    with open(path, "rb") as f:
+
+# 按块读取的缓冲区大小；每个哈希线程复用自己的一块，不做 mmap（扫描期间文件被截断会触发 SIGBUS）
+READ_CHUNK = 1024 * 1024
+
+# 哈希线程数：兼顾 CPU 与 I/O 重叠
+HASH_WORKERS = min(32, 4 * (os.cpu_count() or 1))
+
+_tls = threading.local()
+
+if _blake3 is not None:
+    _CONTENT_PREFIX, _new_content_hasher = "b3:", _blake3.blake3
+else:
+    _CONTENT_PREFIX, _new_content_hasher = "b2:", hashlib.blake2b
+
+
+def _read_buffer() -> memoryview:
+    buf = getattr(_tls, "buf", None)
+    if buf is None:
+        buf = _tls.buf = memoryview(bytearray(READ_CHUNK))
+    return buf
+
+
+def _hash_file(path: str, hashers: List[Any]) -> List[Any]:
+    """把文件内容按块读入线程本地缓冲区，依次喂给各 hasher（hashlib 对大块数据释放 GIL）。"""
+    buf = _read_buffer()
+    with open(path, "rb", buffering=0) as f:
         while True:
-            chunk = f.read(chunk_size)
-            if not chunk:
+            n = f.readinto(buf)
+            if not n:
                 break
-            m.update(chunk)
-    return m.hexdigest()
-
-
-def pseudo_qetag(path: str) -> str:
-    # Placeholder: for MVP we reuse md5; later replace with qetag algorithm
-    return file_md5(path)
-
-
-def scan_directory(root: str) -> Iterable[Dict]:
-    root_path = Path(root)
-    for dirpath, dirnames, filenames in os.walk(root_path):
-        # prune ignored directories globally
-        dirnames[:] = [d for d in dirnames if d not in {"__sync", ".stfolder"}]
-        # at top-level, only traverse allowed subfolders
-        if Path(dirpath).resolve() == root_path.resolve():
-            allowed = {"index.files", "new", "images", "assets", "android"}
-            dirnames[:] = [d for d in dirnames if d.lower() in allowed]
-        for name in filenames:
-            # file-level ignores
-            lname = name.lower()
-            if lname == ".stfolder" or lname == ".htaccess":
-                continue
-            ext_lower = Path(name).suffix.lower()
-            if ext_lower in {".exe", ".txt", ".ini", ".xls", ".xlsx", ".doc", ".docx", ".ppt", ".pptx", ".ink", ".apk", ".zip", ".pdf", ".tmp"}:
-                continue
+            chunk = buf[:n]
+            for h in hashers:
+                h.update(chunk)
+    return hashers
+
+
+def file_md5(path: str) -> str:
+    return _hash_file(path, [hashlib.md5()])[0].hexdigest()
+
+
+def file_content_hash(path: str) -> str:
+    """本地变更检测用的快速指纹（BLAKE3，未安装时用 BLAKE2b）；带算法前缀，切换算法后旧值自然失配而不会误判。"""
+    return _CONTENT_PREFIX + _hash_file(path, [_new_content_hasher()])[0].hexdigest()
+
+
+def file_hashes(path: str) -> Tuple[str, str]:
+    """一次读取同时得到 (md5, content_hash)。"""
+    md5, content = _hash_file(path, [hashlib.md5(), _new_content_hasher()])
+    return md5.hexdigest(), _CONTENT_PREFIX + content.hexdigest()
+
+
+# 遍历过滤规则
+_IGNORED_DIRS = frozenset({"__sync", ".stfolder"})
+_TOP_LEVEL_DIRS = frozenset({"index.files", "new", "images", "assets", "android"})
+_IGNORED_NAMES = frozenset({".stfolder", ".htaccess"})
+_BLOCKED_EXTS = frozenset({
+    ".exe", ".txt", ".ini", ".xls", ".xlsx", ".doc", ".docx", ".ppt", ".pptx",
+    ".ink", ".apk", ".zip", ".pdf", ".tmp",
+})
+# 长后缀在前，供 str.endswith 一次性匹配
+_REJECT_SUFFIXES = tuple(sorted(_BLOCKED_EXTS, key=len, reverse=True))
+
+
+def _walk(root: str) -> Iterable[Tuple[str, str, os.stat_result, str]]:
+    """产出 (rel_path, 绝对路径, stat 结果, ext)，只做遍历、过滤与 stat。
+
+    基于 os.scandir：目录项自带类型信息，Windows 上 entry.stat() 也无需额外系统调用。
+    文件名与扩展名过滤在 stat 之前完成；是否顶层随栈记录，不对子目录做路径解析。
+    """
+    # 根目录只解析一次，之后的 entry.path 都是绝对路径，哈希线程不依赖当前工作目录
+    root = os.path.realpath(root)
+    # (目录路径, 相对前缀, 是否顶层)
+    stack = [(root, "", True)]
+    while stack:
+        dirpath, prefix, top = stack.pop()
+        try:
+            it = os.scandir(dirpath)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                name = entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        # prune ignored directories globally
+                        if name in _IGNORED_DIRS:
+                            continue
+                        # at top-level, only traverse allowed subfolders
+                        if top and name.lower() not in _TOP_LEVEL_DIRS:
+                            continue
+                        stack.append((entry.path, f"{prefix}{name}/", False))
+                        continue
+                except OSError:
+                    continue
+                # file-level ignores（与 Path.suffix 语义一致：以点开头或结尾的名字没有扩展名）
+                lname = name.lower()
+                if lname in _IGNORED_NAMES:
+                    continue
+                dot = lname.rfind(".")
+                # dot > 0：名字本身就是后缀（如 ".txt"）时 Path.suffix 为空，不拦截
+                if dot > 0 and lname.endswith(_REJECT_SUFFIXES):
+                    continue
+                ext = lname[dot:] if 0 < dot < len(lname) - 1 else ""
+                try:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                yield f"{prefix}{name}", entry.path, st, ext
+
+
+def _hash_record(fp: str, record: Dict, prev: Optional[Dict]) -> Dict:
+    size = record["size"]
+    if prev and prev.get("md5") and prev.get("content_hash") and prev.get("size") == size:
+        # 仅 mtime 变化：先比对快速指纹，内容未变则沿用缓存的 md5
+        content_hash = file_content_hash(fp)
+        md5 = prev["md5"] if content_hash == prev["content_hash"] else file_md5(fp)
+    else:
+        md5, content_hash = file_hashes(fp)
+    record["md5"] = md5
+    # MVP: qetag 暂与 md5 相同，复用同一次读取的结果
+    record["qetag"] = md5
+    record["content_hash"] = content_hash
+    return record
+
+
+def _completed(futures: Iterable[Future]) -> Iterable[Dict]:
+    for fut in futures:
+        try:
+            yield fut.result()
+        except Exception:
+            continue
+
+
+def scan_directory(root: str, prev_index: Optional[Dict[str, Dict]] = None, max_workers: int = HASH_WORKERS) -> Iterable[Dict]:
+    """遍历同步目录；prev_index 为上次扫描结果，size 与 mtime_ns 未变的文件直接复用其 md5/qetag/content_hash。
 
-            rel = str(Path(dirpath, name).relative_to(root_path)).replace("\\", "/")
-            if rel.startswith("__sync/") or "/__sync/" in rel or "/.stfolder/" in rel:
+    需要计算哈希的文件交给线程池（hashlib 计算时释放 GIL），结果按完成顺序产出。
+    """
+    prev_index = prev_index or {}
+    pending = set()
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        for rel, fp, st, ext in _walk(root):
+            size = st.st_size
+            mtime_ns = st.st_mtime_ns
+            record = {"rel_path": rel, "size": size, "mtime_ns": mtime_ns, "ext": ext}
+            prev = prev_index.get(rel)
+            if prev and prev.get("md5") and prev.get("size") == size and prev.get("mtime_ns") == mtime_ns:
+                record["mtime_utc"] = prev.get("mtime_utc") or _utc_iso(mtime_ns)
+                record["md5"] = prev["md5"]
+                record["qetag"] = prev.get("qetag") or prev["md5"]
+                record["content_hash"] = prev.get("content_hash")
+                yield record
                 continue
-            fp = str(Path(dirpath, name))
-            try:
-                st = os.stat(fp)
-                size = st.st_size
-                mtime = _utc_iso(st.st_mtime)
-                ext = Path(name).suffix.lower()
-                md5 = file_md5(fp)
-                qetag = pseudo_qetag(fp)
-                yield {
-                    "rel_path": rel,
-                    "size": size,
-                    "mtime_utc": mtime,
-                    "md5": md5,
-                    "qetag": qetag,
-                    "ext": ext,
-                }
-            except Exception:
-                continue 
\ No newline at end of file
+            record["mtime_utc"] = _utc_iso(mtime_ns)
+            pending.add(ex.submit(_hash_record, fp, record, prev))
+            # 限制在途任务数，避免大目录一次性堆积
+            if len(pending) >= max_workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from _completed(done)
+        yield from _completed(as_completed(pending))
@@ -2,11 +2,13 @@ import os
 import threading
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Callable, Dict
 
 try:
+    from ._json import dumps
     from .config import AppConfig, app_data_dir
     from .device_id import ensure_device_id
     from .manifest import Manifest, ManifestEntry
@@ -20,6 +22,7 @@ try:
 except ImportError:
     import sys as _sys, os as _os
     _sys.path.append(_os.path.dirname(_os.path.dirname(__file__)))
+    from sync._json import dumps
     from sync.config import AppConfig, app_data_dir
     from sync.device_id import ensure_device_id
     from sync.manifest import Manifest, ManifestEntry
@@ -34,6 +37,12 @@ except ImportError:
 
 LOCK_GRACE_MINUTES = 5
 
+# settings 中记录 local_files 所属配置的键
+_LOCAL_FILES_PROFILE = "local_files_profile"
+
+# 扫描结果中与本地索引比对的列
+_SCAN_COLUMNS = ("size", "mtime_ns", "mtime_utc", "md5", "qetag", "content_hash")
+
 
 class SyncEngine:
     def __init__(self, logger: Callable[[str], None], state_cb: Callable[[str], None]):
@@ -81,6 +90,10 @@ class SyncEngine:
             self._skip_delete_once = True
             save_last_profile_key(current_key)
             self.logger("检测到配置切换(空间/域名/本地目录)，本轮将跳过远端删除")
+        # local_files 为全局表且按 rel_path 复用哈希：只信任当前配置扫描写入的记录
+        if store.get_setting(_LOCAL_FILES_PROFILE) != current_key:
+            store.clear_local_files()
+            store.set_setting(_LOCAL_FILES_PROFILE, current_key)
 
         interval = max(1, int(cfg.scan_interval_minutes or 5)) * 60
         while not self._stop.is_set():
@@ -88,7 +101,17 @@ class SyncEngine:
                 self._cycle_count += 1
                 self.logger(f"开始同步 第{self._cycle_count}轮")
                 self.state_cb("扫描与同步中")
-                self._cycle(cfg, store, qn)
+                try:
+                    self._cycle(cfg, store, qn)
+                except Exception:
+                    # 本轮失败也要等后台写入结束；写入错误单独记录，不覆盖原始异常
+                    try:
+                        store.flush()
+                    except Exception as fe:
+                        self.logger(f"错误: {fe}")
+                    raise
+                # 本轮的后台写入落盘后再进入下一轮，保证 load_local_index 读到最新结果
+                store.flush()
                 self.state_cb("空闲")
                 try:
                     interval = max(1, int(cfg.scan_interval_minutes or 5)) * 60
@@ -106,25 +129,37 @@ class SyncEngine:
                     self._kick.clear()
                     break
                 time.sleep(1)
+        store.close()
 
     def _cycle(self, cfg: AppConfig, store: SQLiteStore, qn: QiniuClient):
         # 1) Load manifest: prefer the newer between remote and local cache (to avoid CDN延迟导致的旧清单)
-        manifest, etag = qn.download_manifest()
-        cached_dict, cached_etag = load_manifest_cache(self._profile_key or "default")
-        if manifest and cached_dict:
+        profile_key = self._profile_key or "default"
+        cached_dict, cached_etag = load_manifest_cache(profile_key)
+        # 带上缓存的 ETag 做条件请求，远端未变化时 304 直接复用缓存
+        manifest, etag = qn.download_manifest(cached_dict, cached_etag)
+        if manifest and cached_dict and etag and etag == cached_etag:
+            self.logger("远端清单未变化，使用本地清单缓存")
+        elif manifest and cached_dict:
             try:
                 cached_m = Manifest.from_dict(cached_dict)
                 remote_ts = manifest.generated_at_utc or ""
                 cached_ts = cached_m.generated_at_utc or ""
                 # 比较时间字符串，ISO8601可直接比字符串，或显式解析
                 if cached_ts >= remote_ts:
+                    if etag and cached_ts == remote_ts:
+                        # 同一份清单（通常是本机上轮上传的），记录远端 ETag 以便下轮命中 304
+                        save_manifest_cache(profile_key, cached_dict, etag)
+                    else:
+                        etag = cached_etag
                     manifest = cached_m
-                    etag = cached_etag
                     self.logger("检测到本地清单更新不早于远端，优先使用本地清单缓存")
                 else:
+                    save_manifest_cache(profile_key, manifest.to_dict(), etag)
                     self.logger("使用远端清单")
             except Exception:
                 self.logger("清单比对失败，回退使用远端/本地可用者")
+        elif manifest and etag:
+            save_manifest_cache(profile_key, manifest.to_dict(), etag)
         if not manifest:
             if cached_dict:
                 manifest = Manifest.from_dict(cached_dict)
@@ -133,20 +168,21 @@ class SyncEngine:
             else:
                 manifest = Manifest.empty(cfg.device_id or "")
 
-        # Build server index dict
-        server_index = {k: vars(v) for k, v in manifest.files.items()}
-
         # 2) Local scan
         local_index: Dict[str, Dict] = {}
         now_iso = datetime.now(timezone.utc).isoformat()
-        for r in scan_directory(cfg.local_dir or "."):
+        prev_index = store.load_local_index()
+        for r in scan_directory(cfg.local_dir or ".", prev_index):
             r["modified_by_device_id"] = cfg.device_id or ""
             r["deleted"] = 0
             local_index[r["rel_path"]] = r
-            store.upsert_local_file({**r, "last_scanned_at_utc": now_iso})
+            # 只回写新增或有变化的文件；空闲轮次不产生任何数据库写入
+            prev = prev_index.get(r["rel_path"])
+            if not prev or any(prev.get(c) != r.get(c) for c in _SCAN_COLUMNS):
+                store.upsert_local_file_async({**r, "last_scanned_at_utc": now_iso})
 
         # 3) Diff (based on md5)
-        diff = compute_diff(local_index, server_index)
+        diff = compute_diff(local_index, manifest.files)
         if self._skip_delete_once:
             # clear remote deletes once after profile switch
             diff.to_delete_remote = []
@@ -227,36 +263,55 @@ class SyncEngine:
             rel_url = apply_prefix(rel_path).replace("\\", "/")
             return f"{_domain_base}/{rel_url}"
 
-        for rel in diff.to_upload:
-            try:
-                self.state_cb(f"CURRENT|{rel}")
-            except Exception:
-                pass
-            local_path = str(Path(cfg.local_dir or ".") / rel)
+        # 上传/删除均为网络往返，线程池并发以重叠延迟；回调经锁串行化
+        cb_lock = threading.Lock()
+        local_root = Path(cfg.local_dir or ".")
+
+        def upload_one(rel: str):
+            with cb_lock:
+                try:
+                    self.state_cb(f"CURRENT|{rel}")
+                except Exception:
+                    pass
+            local_path = str(local_root / rel)
             key = apply_prefix(rel)
             if os.path.exists(local_path):
-                if qn.upload_file(key, local_path):
+                ok = qn.upload_file(key, local_path)
+                with cb_lock:
+                    if ok:
+                        url = build_url(rel)
+                        if url:
+                            self.logger(f"上传: {rel} -> {url}")
+                        else:
+                            self.logger(f"上传: {rel}")
+                    else:
+                        self.logger(f"上传失败: {rel}")
+
+        def delete_one(rel: str):
+            with cb_lock:
+                try:
+                    self.state_cb(f"CURRENT|{rel}")
+                except Exception:
+                    pass
+            ok = qn.delete_file(apply_prefix(rel))
+            with cb_lock:
+                if ok:
                     url = build_url(rel)
                     if url:
-                        self.logger(f"上传: {rel} -> {url}")
+                        self.logger(f"远端删除: {rel} -> {url}")
                     else:
-                        self.logger(f"上传: {rel}")
+                        self.logger(f"远端删除: {rel}")
                 else:
-                    self.logger(f"上传失败: {rel}")
+                    self.logger(f"远端删除失败: {rel}")
 
-        for rel in diff.to_delete_remote:
-            try:
-                self.state_cb(f"CURRENT|{rel}")
-            except Exception:
-                pass
-            if qn.delete_file(apply_prefix(rel)):
-                url = build_url(rel)
-                if url:
-                    self.logger(f"远端删除: {rel} -> {url}")
-                else:
-                    self.logger(f"远端删除: {rel}")
-            else:
-                self.logger(f"远端删除失败: {rel}")
+        workers = max(1, int(getattr(cfg, "upload_concurrency", 0) or 8))
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            for fn, rels in ((upload_one, diff.to_upload), (delete_one, diff.to_delete_remote)):
+                for fut in as_completed([ex.submit(fn, rel) for rel in rels]):
+                    try:
+                        fut.result()
+                    except Exception as e:
+                        self.logger(f"错误: {e}")
 
         try:
             self.state_cb("CURRENT|")  # clear current file
@@ -282,11 +337,12 @@ class SyncEngine:
                 modified_by_device_id=cfg.device_id or "",
                 deleted=r.get("deleted", 0),
             )
-        if qn.upload_manifest(new_manifest):
+        manifest_dict = new_manifest.to_dict()
+        if qn.upload_manifest(new_manifest, dumps(manifest_dict)):
             self.logger("清单已更新")
             # Save cache after successful upload to reduce future downloads
             try:
-                save_manifest_cache(self._profile_key or "default", new_manifest.to_dict(), etag)
+                save_manifest_cache(profile_key, manifest_dict, etag)
             except Exception:
                 pass
         else:
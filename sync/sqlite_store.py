@@ -1,11 +1,19 @@
+import queue
 import sqlite3
+import threading
 from dataclasses import dataclass
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
 from typing import Dict, Iterable, List, Optional, Tuple
 
 
 SCHEMA = """
 PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+PRAGMA mmap_size=268435456;
+PRAGMA cache_size=-65536;
+PRAGMA temp_store=MEMORY;
 CREATE TABLE IF NOT EXISTS local_files (
   rel_path TEXT PRIMARY KEY,
   size INTEGER,
@@ -16,8 +24,13 @@ CREATE TABLE IF NOT EXISTS local_files (
   modified_by_device_id TEXT,
   deleted INTEGER DEFAULT 0,
   last_scanned_at_utc TEXT,
-  last_synced_at_utc TEXT
-);
+  last_synced_at_utc TEXT,
+  content_hash TEXT,
+  mtime_ns INTEGER
+) WITHOUT ROWID;
+
+-- 早期版本建过、但没有任何查询用到的索引
+DROP INDEX IF EXISTS idx_local_size_mtime;
 
 CREATE TABLE IF NOT EXISTS server_index (
   rel_path TEXT PRIMARY KEY,
@@ -29,7 +42,7 @@ CREATE TABLE IF NOT EXISTS server_index (
   modified_by_device_id TEXT,
   deleted INTEGER,
   manifest_seq INTEGER
-);
+) WITHOUT ROWID;
 
 CREATE TABLE IF NOT EXISTS settings (
   key TEXT PRIMARY KEY,
@@ -38,32 +51,120 @@ CREATE TABLE IF NOT EXISTS settings (
 """
 
 
+LOCAL_FILE_COLUMNS = (
+    "rel_path","size","mtime_utc","md5","qetag","ext",
+    "modified_by_device_id","deleted","last_scanned_at_utc","last_synced_at_utc","content_hash","mtime_ns",
+)
+
+UPSERT_LOCAL_FILE_SQL = (
+    f"INSERT INTO local_files ({','.join(LOCAL_FILE_COLUMNS)}) VALUES ({','.join(['?'] * len(LOCAL_FILE_COLUMNS))})\n"
+    f"ON CONFLICT(rel_path) DO UPDATE SET "
+    f"size=excluded.size, mtime_utc=excluded.mtime_utc, md5=excluded.md5, qetag=excluded.qetag, ext=excluded.ext, "
+    f"modified_by_device_id=excluded.modified_by_device_id, deleted=excluded.deleted, last_scanned_at_utc=excluded.last_scanned_at_utc, "
+    f"content_hash=excluded.content_hash, mtime_ns=excluded.mtime_ns"
+)
+
+# 后台写线程每个事务最多提交的语句数
+WRITE_BATCH = 500
+BUSY_TIMEOUT = 30.0
+
+
 class SQLiteStore:
     def __init__(self, db_path: str):
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=BUSY_TIMEOUT)
         self.conn.row_factory = sqlite3.Row
         self._ensure_schema()
+        # 本地文件行由后台线程用独立连接写入（WAL 下不阻塞读取），调用方入队即返回
+        self._q: "queue.Queue[Optional[Tuple[str, tuple]]]" = queue.Queue()
+        self._write_error: Optional[BaseException] = None
+        self._writer = threading.Thread(target=self._drain, name="sqlite-writer", daemon=True)
+        try:
+            self._writer.start()
+        except RuntimeError as e:  # 无法创建线程时记录错误，由 flush 抛出
+            self._write_error = e
+
+    def _drain(self):
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT)
+            try:
+                conn.execute("PRAGMA synchronous=NORMAL")
+                self._write_loop(conn)
+            finally:
+                conn.close()
+        except BaseException as e:
+            self._write_error = e
+        finally:
+            # 写线程退出后不再有人消费队列：剩余任务直接标记完成，避免 flush 卡在 join 上
+            while True:
+                try:
+                    self._q.get_nowait()
+                except queue.Empty:
+                    break
+                self._q.task_done()
+
+    def _write_loop(self, conn: sqlite3.Connection):
+        while True:
+            batch = [self._q.get()]
+            try:
+                while len(batch) < WRITE_BATCH:
+                    try:
+                        batch.append(self._q.get_nowait())
+                    except queue.Empty:
+                        break
+                items = [b for b in batch if b is not None]
+                try:
+                    with conn:
+                        # 相邻的同一语句合并为一次 executemany
+                        for sql, group in groupby(items, key=itemgetter(0)):
+                            conn.executemany(sql, [params for _, params in group])
+                except Exception as e:
+                    self._write_error = e
+            finally:
+                for _ in batch:
+                    self._q.task_done()
+            if len(items) != len(batch):
+                return
 
     def _ensure_schema(self):
         with self.conn:
             self.conn.executescript(SCHEMA)
+            # 旧库迁移：补齐后续新增的列
+            cols = {row["name"] for row in self.conn.execute("PRAGMA table_info(local_files)")}
+            for name, decl in (("content_hash", "TEXT"), ("mtime_ns", "INTEGER")):
+                if name not in cols:
+                    self.conn.execute(f"ALTER TABLE local_files ADD COLUMN {name} {decl}")
 
     def upsert_local_file(self, record: Dict):
-        cols = [
-            "rel_path","size","mtime_utc","md5","qetag","ext",
-            "modified_by_device_id","deleted","last_scanned_at_utc","last_synced_at_utc"
-        ]
-        values = [record.get(c) for c in cols]
-        placeholders = ",".join(["?"] * len(cols))
+        """同步写入单行：同样经由后台写线程，写完才返回。"""
+        self.upsert_local_file_async(record)
+        self.flush()
+
+    def upsert_local_file_async(self, record: Dict):
+        """入队后立即返回；需要读到结果前调用 flush()。"""
+        # 写线程已退出时不再入队（无人消费只会堆积），由 flush 报错
+        if self._writer.is_alive():
+            self._q.put((UPSERT_LOCAL_FILE_SQL, tuple(record.get(c) for c in LOCAL_FILE_COLUMNS)))
+
+    def flush(self):
+        """等待已入队的写入全部提交；后台写入失败或写线程已退出时在这里抛出。"""
+        if self._writer.is_alive():
+            self._q.join()
+        err, self._write_error = self._write_error, None
+        if err is not None:
+            raise err
+        if not self._writer.is_alive():
+            raise RuntimeError("SQLite 后台写线程已退出")
+
+    def clear_local_files(self):
+        self.flush()
         with self.conn:
-            self.conn.execute(
-                f"INSERT INTO local_files ({','.join(cols)}) VALUES ({placeholders})\n"
-                f"ON CONFLICT(rel_path) DO UPDATE SET "
-                f"size=excluded.size, mtime_utc=excluded.mtime_utc, md5=excluded.md5, qetag=excluded.qetag, ext=excluded.ext, "
-                f"modified_by_device_id=excluded.modified_by_device_id, deleted=excluded.deleted, last_scanned_at_utc=excluded.last_scanned_at_utc",
-                values,
-            )
+            self.conn.execute("DELETE FROM local_files")
+
+    def load_local_index(self) -> Dict[str, Dict]:
+        cur = self.conn.execute("SELECT rel_path,size,mtime_utc,mtime_ns,md5,qetag,content_hash FROM local_files")
+        return {row["rel_path"]: dict(row) for row in cur}
 
     def replace_server_index(self, rows: Iterable[Dict], manifest_seq: int):
         with self.conn:
@@ -94,6 +195,12 @@ class SQLiteStore:
             )
 
     def close(self):
+        try:
+            if self._writer.is_alive():
+                self._q.put(None)
+                self._writer.join()
+        except Exception:
+            pass
         try:
             self.conn.close()
         except Exception: